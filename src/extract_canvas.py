@@ -3,6 +3,9 @@ import requests
 import re
 import logging
 import os
+import json
+import html
+from datetime import datetime
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -77,7 +80,7 @@ def catch_link_report_by_id(api_url, course_id, headers, cert, quiz_id, max_wait
     return None, None
 
 
-def download_save(report_name, report_link, headers, cert, path_download):
+def download_save(report_name, report_link, headers, cert, path_download, overwrite=False):
     safe_name = re.sub(r'[<>:"/\\|?*]', '-', report_name).strip()
     file_path = f'{path_download}/{safe_name}'
 
@@ -85,7 +88,7 @@ def download_save(report_name, report_link, headers, cert, path_download):
         logging.error('Erro ao acessar o link do relatório.')
         return
 
-    if os.path.exists(file_path):
+    if os.path.exists(file_path) and not overwrite:
         logging.warning(f'Arquivo já existente. Verifique em: {file_path}')
         return
 
@@ -100,3 +103,237 @@ def download_save(report_name, report_link, headers, cert, path_download):
             logging.error(f'{response.status_code}: {response.text}')
     except Exception as e:
         logging.error(f'Ocorreu um erro ao salvar o arquivo: {e}')
+
+
+# -------------------------------------------------------------------
+# Extração incremental (watermark por quiz)
+# -------------------------------------------------------------------
+
+def load_watermark(state_path, quiz_id):
+    """Retorna o watermark salvo para o quiz ({'submitted': ..., 'dataset': ...}) ou None."""
+    if not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, encoding='utf-8') as file:
+            state = json.load(file)
+        return state.get(str(quiz_id))
+    except Exception as e:
+        logging.error(f'Erro ao ler watermark em {state_path}: {e}')
+        return None
+
+
+def save_watermark(state_path, quiz_id, submitted, dataset):
+    """Grava o maior 'submitted' já processado do quiz e o dataset tratado correspondente."""
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, encoding='utf-8') as file:
+            state = json.load(file)
+    state[str(quiz_id)] = {'submitted': submitted, 'dataset': dataset}
+    with open(state_path, 'w', encoding='utf-8') as file:
+        json.dump(state, file, ensure_ascii=False, indent=2)
+    logging.info(f'Watermark do quiz {quiz_id} atualizado para {submitted}')
+
+
+# Resultado de catch_incremental_rows
+INCREMENTAL_OK = 'ok'                    # todas as submissions novas reconstruídas
+INCREMENTAL_PARTIAL = 'partial'          # falhas temporárias: watermark retido antes delas
+INCREMENTAL_UNAVAILABLE = 'unavailable'  # eventos indisponíveis: usar o student analysis completo
+INCREMENTAL_ERROR = 'error'              # listagem de submissions/perguntas falhou
+
+
+class CanvasRequestError(RuntimeError):
+    """Resposta não-200 da API do Canvas (status_code disponível para o chamador)."""
+
+    def __init__(self, status_code, text):
+        super().__init__(f'{status_code}: {text}')
+        self.status_code = status_code
+
+
+def _get_paginated(url, headers, cert, key=None, params=None):
+    """
+    Percorre todas as páginas (header Link rel="next") e devolve os itens concatenados.
+    Levanta CanvasRequestError se qualquer página falhar, para nunca tratar lista parcial como completa.
+    """
+    items = []
+    extras = {}
+    params = dict(params or {}, per_page=100)
+    while url:
+        response = requests.get(headers=headers, url=url, verify=cert, params=params, timeout=30)
+        if response.status_code != 200:
+            raise CanvasRequestError(response.status_code, response.text)
+        result = response.json()
+        if key is None:
+            items.extend(result)
+        else:
+            items.extend(result.get(key, []))
+            for extra_key, value in result.items():
+                if extra_key != key and isinstance(value, list):
+                    extras.setdefault(extra_key, []).extend(value)
+        url = response.links.get('next', {}).get('url')
+        params = None  # a URL 'next' já carrega os parâmetros
+    return items, extras
+
+
+def _parse_ts(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+
+def latest_finished_at(submissions, default=None):
+    """Maior finished_at (ISO) entre as submissions; usado como novo watermark."""
+    stamps = [s['finished_at'] for s in submissions if s.get('finished_at')]
+    return max(stamps, key=_parse_ts) if stamps else default
+
+
+def catch_new_submissions(api_url, course_id, headers, cert, quiz_id, since=None):
+    """
+    Lista as quiz submissions concluídas com finished_at posterior ao watermark 'since'.
+    Cada item recebe 'user' (name, sis_user_id) quando disponível.
+    Retorna None se a listagem falhar.
+    """
+    url = f'{api_url}/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions'
+    try:
+        submissions, extras = _get_paginated(url, headers, cert, key='quiz_submissions',
+                                             params={'include[]': 'user'})
+    except Exception as e:
+        logging.error(f'Erro ao buscar submissions do quiz: {e}')
+        return None
+
+    users = {u.get('id'): u for u in extras.get('users', [])}
+    since_ts = _parse_ts(since)
+    new = []
+    for sub in submissions:
+        finished = _parse_ts(sub.get('finished_at'))
+        if sub.get('workflow_state') not in ('complete', 'pending_review') or finished is None:
+            continue
+        # '<' e não '<=': o watermark tem resolução de segundos, então uma submission
+        # no mesmo segundo pode surgir depois; rebuscá-la é inofensivo (merge por sis_id)
+        if since_ts and finished < since_ts:
+            continue
+        sub['user'] = users.get(sub.get('user_id'), {})
+        new.append(sub)
+
+    logging.info(f'{len(new)} submission(s) nova(s) desde {since or "o início"}.')
+    return new
+
+
+def catch_quiz_questions(api_url, course_id, headers, cert, quiz_id):
+    """Retorna as perguntas do quiz ordenadas por posição (None se a busca falhar)."""
+    url = f'{api_url}/api/v1/courses/{course_id}/quizzes/{quiz_id}/questions'
+    try:
+        questions, _ = _get_paginated(url, headers, cert)
+    except Exception as e:
+        logging.error(f'Erro ao buscar perguntas do quiz: {e}')
+        return None
+    return sorted(questions, key=lambda q: (q.get('position') or 0, q.get('id') or 0))
+
+
+def _strip_html(text):
+    text = re.sub(r'<br\s*/?>|</p>', '\n', str(text or ''), flags=re.IGNORECASE)
+    return html.unescape(re.sub(r'<[^>]+>', '', text)).strip()
+
+
+def _format_answer(question, answer):
+    """Converte a resposta registrada no evento para o texto exibido no student analysis."""
+    if answer is None:
+        return ''
+    choices = {str(a.get('id')): a.get('text', '') for a in question.get('answers') or []}
+    if isinstance(answer, list):
+        return ','.join(choices.get(str(a), str(a)) for a in answer)
+    if isinstance(answer, dict):
+        return ','.join(str(v) for v in answer.values() if v)
+    if choices and str(answer) in choices:
+        return choices[str(answer)]
+    return _strip_html(answer)
+
+
+def catch_submission_answers(api_url, course_id, headers, cert, quiz_id, submission, questions):
+    """
+    Reconstrói as respostas de uma submission a partir dos eventos 'question_answered'
+    (vale a última resposta de cada pergunta). Retorna {question_id: texto}.
+    Retorna {} quando os eventos não existem (404 com o log de auditoria do quiz desativado,
+    ou submission sem eventos de resposta) e None em falhas temporárias.
+    """
+    url = f'{api_url}/api/v1/courses/{course_id}/quizzes/{quiz_id}/submissions/{submission["id"]}/events'
+    try:
+        events, _ = _get_paginated(url, headers, cert, key='quiz_submission_events',
+                                   params={'attempt': submission.get('attempt')})
+    except CanvasRequestError as e:
+        if e.status_code == 404:
+            logging.warning(f'Eventos indisponíveis para a submission {submission["id"]}.')
+            return {}
+        logging.error(f'Erro ao buscar eventos da submission {submission["id"]}: {e}')
+        return None
+    except Exception as e:
+        logging.error(f'Erro ao buscar eventos da submission {submission["id"]}: {e}')
+        return None
+
+    by_id = {str(q.get('id')): q for q in questions}
+    answers = {}
+    for event in sorted(events, key=lambda ev: ev.get('created_at') or ''):
+        if event.get('event_type') != 'question_answered':
+            continue
+        for item in event.get('event_data') or []:
+            qid = str(item.get('quiz_question_id'))
+            if qid in by_id:
+                answers[qid] = _format_answer(by_id[qid], item.get('answer'))
+    return answers
+
+
+def catch_incremental_rows(api_url, course_id, headers, cert, quiz_id, since=None):
+    """
+    Busca apenas as submissions posteriores ao watermark e monta linhas no mesmo
+    layout de colunas do student analysis (name, id, sis_id, ..., submitted, '<id>: <pergunta>', ...),
+    prontas para transformer.load_clean_rows.
+    Submissions com falha temporária são descartadas e o watermark não avança além
+    delas (INCREMENTAL_PARTIAL). Se os eventos de alguma submission não existem, as
+    respostas nunca serão reconstruídas por aqui: retorna INCREMENTAL_UNAVAILABLE para
+    o chamador recorrer ao student analysis completo.
+    Retorna (linhas, colunas, novo_watermark, status).
+    """
+    submissions = catch_new_submissions(api_url, course_id, headers, cert, quiz_id, since=since)
+    if submissions is None:
+        return None, None, since, INCREMENTAL_ERROR
+    if not submissions:
+        return [], [], since, INCREMENTAL_OK
+
+    questions = catch_quiz_questions(api_url, course_id, headers, cert, quiz_id)
+    if not questions:
+        logging.error('Não foi possível obter as perguntas do quiz.')
+        return None, None, since, INCREMENTAL_ERROR
+
+    q_cols = [f'{q["id"]}: {_strip_html(q.get("question_text"))}' for q in questions]
+    columns = ['name', 'id', 'sis_id', 'section', 'section_id', 'section_sis_id', 'submitted']
+    columns += [c for q_col in q_cols for c in (q_col, f'{q_col} score')]
+
+    rows = []
+    processed = []
+    failed = []
+    for sub in submissions:
+        answers = catch_submission_answers(api_url, course_id, headers, cert, quiz_id, sub, questions)
+        if answers is None:
+            # Nunca gerar linha em branco: ela substituiria o relatório já existente do docente
+            logging.warning(f'Respostas da submission {sub["id"]} não reconstruídas; ignorada nesta execução.')
+            failed.append(sub)
+            continue
+        if not any(answers.values()):
+            # Condição permanente (auditoria desativada, submission anterior a ela ou em branco)
+            logging.warning(f'Submission {sub["id"]} sem eventos de resposta; é preciso o student analysis completo.')
+            return None, None, since, INCREMENTAL_UNAVAILABLE
+        user = sub.get('user') or {}
+        row = {
+            'name': user.get('name', ''),
+            'id': sub.get('user_id'),
+            'sis_id': user.get('sis_user_id') or '',
+            'submitted': sub.get('finished_at'),
+        }
+        for q, q_col in zip(questions, q_cols):
+            row[q_col] = answers.get(str(q['id']), '')
+        rows.append(row)
+        processed.append(sub)
+
+    if failed:
+        oldest_failed = min(_parse_ts(s['finished_at']) for s in failed)
+        processed = [s for s in processed if _parse_ts(s['finished_at']) < oldest_failed]
+
+    status = INCREMENTAL_PARTIAL if failed else INCREMENTAL_OK
+    return rows, columns, latest_finished_at(processed, default=since), status
@@ -1,31 +1,60 @@
+"""
+Orquestrador / CLI do projeto.
 
-import certifi
-import os
+Subcomandos (cada um importa apenas o que usa; credenciais do Canvas só são
+validadas por quem acessa a API):
+    python src/main.py extract   [--ano 2025] [--quiz-id 123]
+    python src/main.py transform <arquivo bruto em data/raw>
+    python src/main.py render    <arquivo tratado em data/processed> [--sis-id ...]
+    python src/main.py merge     [--mes Junho --ano 2025]
+    python src/main.py run       [--ano 2025] [--quiz-id 123] [--incremental]
+    python src/main.py serve     [--port 8765]
+Sem subcomando, executa `run` (fluxo interativo de ponta-a-ponta).
+"""
+import argparse
 import logging
-from dotenv import load_dotenv, find_dotenv
+import os
+import sys
 from pathlib import Path
-import extract_canvas
-import transformer
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 CURRENT_DIR = Path(__file__).resolve().parent
 CANVAS_API_URL = 'https://famonline.instructure.com'
 
-load_dotenv(find_dotenv(filename='canvas_tkn.env'))
-token = os.getenv('canvas_token')
-if not token:
-    raise RuntimeError('Token não encontrado. Verifique o arquivo .env e a variável.')
-
-headers = {'Authorization': f'Bearer {token}'}
-cert = certifi.where()
 course_id = 15812
 path_download = CURRENT_DIR.parent / 'data' / 'raw'
 path_data_ps = CURRENT_DIR.parent / 'data' / 'processed'
+path_watermarks = path_data_ps / 'watermarks.json'
+fonts_dir = CURRENT_DIR.parent / 'fonts'
+overlays_dir = path_data_ps / 'overlay'
+final_dir = path_data_ps / 'final'
+template_pdf = CURRENT_DIR.parent / 'template' / 'Template_Clean.pdf'
+
+
+def canvas_config():
+    """Carrega o token do canvas_tkn.env; chamado apenas pelos subcomandos que acessam o Canvas."""
+    import certifi
+    from dotenv import load_dotenv, find_dotenv
+
+    load_dotenv(find_dotenv(filename='canvas_tkn.env'))
+    token = os.getenv('canvas_token')
+    if not token:
+        raise RuntimeError('Token não encontrado. Verifique o arquivo .env e a variável.')
+
+    headers = {'Authorization': f'Bearer {token}'}
+    return headers, certifi.where()
+
+
+# -------------------------------------------------------------------
+# Etapas
+# -------------------------------------------------------------------
 
+def choose_quiz(headers, cert, ano=None):
+    """Lista as assignments do ano e retorna o quiz_id escolhido (ou None)."""
+    import extract_canvas
 
-def main():
-    ano = input('Qual o ano do report? ').strip()
+    ano = ano or input('Qual o ano do report? ').strip()
 
     assignments = extract_canvas.catch_assignments(
         api_url=CANVAS_API_URL,
@@ -54,7 +83,12 @@ def main():
         logging.error('Entrada inválida. Digite um número.')
         return
 
-    quiz_id = assignments[escolha_idx]['quiz_id']
+    return assignments[escolha_idx]['quiz_id']
+
+
+def extract(headers, cert, quiz_id, overwrite=False):
+    """Gera o student analysis do quiz no Canvas e baixa em data/raw. Retorna o safe_name."""
+    import extract_canvas
 
     # Gera o Report com o Assignment Escolhido
     report_name, report_link = extract_canvas.catch_link_report_by_id(
@@ -65,66 +99,272 @@ def main():
         quiz_id=quiz_id
     )
 
-    if report_name and report_link:
-        safe_name = extract_canvas.download_save(
-            report_name=report_name,
-            report_link=report_link,
-            headers=headers,
-            cert=cert,
-            path_download=path_download
-        )
-    else:
+    if not (report_name and report_link):
         logging.error('Não foi possível gerar o relatório.')
+        return
+
+    return extract_canvas.download_save(
+        report_name=report_name,
+        report_link=report_link,
+        headers=headers,
+        cert=cert,
+        path_download=path_download,
+        overwrite=overwrite
+    )
+
+
+def transform(safe_name, overwrite=False):
+    """
+    Trata o arquivo bruto e salva em data/processed. Retorna True se o tratamento deu certo
+    e o tratado foi salvo (ou já existia e overwrite=False).
+    """
+    import transformer
 
     # Busca arquivo de download para tratamento dos dados e armazenamento local
     df_clean = transformer.load_clean_report(
         data_path=f'{path_download}/{safe_name}')
-    
-    if df_clean is not None and not df_clean.empty:
-        transformer.save_data_processed(
-            df_clean=df_clean,
-            path_data_p=path_data_ps,
-            name_data_p=safe_name
-        )
-    
-    from render_pdf import build_overlay_one_row, build_overlays_all_rows,merge_all_overlays_with_template
-
-    fonts_dir  = CURRENT_DIR.parent / 'fonts'
-    output_dir = CURRENT_DIR.parent / 'data' / 'processed' / 'overlay'
-    csv_path   = path_data_ps / safe_name
-    template_pdf = CURRENT_DIR.parent / 'template' / 'Template_Clean.pdf'
-    overlays_dir = CURRENT_DIR.parent / 'data' / 'processed' / 'overlay'
-    final_dir    = CURRENT_DIR.parent / 'data' / 'processed' / 'final'
-
-    mes = ""
-    ano = ""
-
-    #build_overlay_one_row(
-    #    csv_path=csv_path, 
-    #    fonts_dir=fonts_dir, 
-    #    output_dir=output_dir, 
-    #    show_boundary=False,
-    #    safe_name=safe_name
-    #    #mes=mes,
-    #    #ano=ano
-    #)
-    
-    build_overlays_all_rows(
+
+    if df_clean is None or df_clean.empty:
+        logging.error(f'Não foi possível tratar o arquivo: {safe_name}')
+        return False
+
+    existed = (path_data_ps / safe_name).exists()
+    saved = transformer.save_data_processed(
+        df_clean=df_clean,
+        path_data_p=path_data_ps,
+        name_data_p=safe_name,
+        overwrite=overwrite
+    )
+    # Sem overwrite, save_data_processed mantém o tratado existente sem regravá-lo
+    return bool(saved) or (existed and not overwrite)
+
+
+def render(safe_name, sis_ids=None, mes=None, ano=None):
+    """Gera os overlays do arquivo tratado (todos ou apenas sis_ids). Retorna os overlays gerados."""
+    csv_path = path_data_ps / safe_name
+    if not csv_path.exists():
+        logging.error(f'Arquivo tratado não encontrado: {csv_path}')
+        return []
+
+    from render_pdf import build_overlays_all_rows
+
+    return build_overlays_all_rows(
         csv_path=csv_path,
         fonts_dir=fonts_dir,
-        output_dir=output_dir,
+        output_dir=overlays_dir,
         show_boundary=False,
-        safe_name=safe_name
+        mes=mes,
+        ano=ano,
+        safe_name=safe_name,
+        sis_ids=sis_ids
     )
 
-    merge_all_overlays_with_template(
+
+def merge(overlays=None, mes=None, ano=None):
+    """Mescla overlays com o template e salva em data/processed/final. Retorna os PDFs finais."""
+    if not template_pdf.exists():
+        logging.error(f'Template não encontrado: {template_pdf}')
+        return []
+
+    from merge_pdf import merge_all_overlays_with_template
+
+    return merge_all_overlays_with_template(
         template_pdf=template_pdf,
         overlays_dir=overlays_dir,
         output_dir=final_dir,
-        #mes=mes,
-        #ano=ano
+        mes=mes,
+        ano=ano,
+        overlays=overlays
+    )
+
+
+def run_incremental(headers, cert, quiz_id, watermark):
+    """
+    Processa apenas as submissions posteriores ao watermark e re-renderiza só esses docentes.
+    Retorna True se tudo foi processado, False em caso de falha ou de submissions descartadas
+    (o watermark fica antes delas) e None quando os eventos do quiz estão indisponíveis
+    e é preciso a extração completa.
+    """
+    import extract_canvas
+    import transformer
+
+    safe_name = watermark['dataset']
+    rows, columns, submitted_wm, status = extract_canvas.catch_incremental_rows(
+        api_url=CANVAS_API_URL,
+        course_id=course_id,
+        headers=headers,
+        cert=cert,
+        quiz_id=quiz_id,
+        since=watermark['submitted']
     )
 
+    if status == extract_canvas.INCREMENTAL_UNAVAILABLE:
+        return None
+
+    if status == extract_canvas.INCREMENTAL_ERROR:
+        logging.error('Falha na extração incremental; watermark mantido.')
+        return False
+
+    if not rows:
+        if status == extract_canvas.INCREMENTAL_PARTIAL:
+            logging.error('Nenhuma submission nova pôde ser processada; watermark mantido.')
+            return False
+        logging.info('Nenhuma submission nova desde a última execução.')
+        return True
+
+    df_new = transformer.load_clean_rows(rows=rows, columns=columns)
+    if df_new is None or df_new.empty:
+        logging.error('Não foi possível tratar as submissions novas.')
+        return False
+
+    if not transformer.merge_data_processed(
+        df_new=df_new,
+        path_data_p=path_data_ps,
+        name_data_p=safe_name
+    ):
+        return False
+
+    overlays = render(safe_name, sis_ids=set(df_new['sis_id']))
+    if not overlays or not merge(overlays=overlays):
+        return False
+
+    extract_canvas.save_watermark(path_watermarks, quiz_id, submitted_wm, safe_name)
+    if status == extract_canvas.INCREMENTAL_PARTIAL:
+        logging.error('Algumas submissions foram descartadas; rode novamente para processá-las.')
+        return False
+    return True
+
+
+def run(ano=None, quiz_id=None, incremental=None):
+    """Fluxo de ponta-a-ponta: extract -> transform -> render -> merge. Retorna True se concluído."""
+    import extract_canvas
+
+    headers, cert = canvas_config()
+    quiz_id = quiz_id or choose_quiz(headers, cert, ano=ano)
+    if not quiz_id:
+        return False
+
+    overwrite = False
+
+    # Extração incremental: se já existe watermark e dataset tratado para o quiz,
+    # busca apenas as submissions novas em vez do student analysis completo
+    watermark = extract_canvas.load_watermark(path_watermarks, quiz_id)
+    if watermark and (path_data_ps / watermark['dataset']).exists():
+        if incremental is None:
+            modo = input(f"\nÚltima submission processada: {watermark['submitted']}. "
+                         "Executar em modo incremental? (s/n) ").strip().lower()
+            incremental = modo == 's'
+        if incremental:
+            result = run_incremental(headers, cert, quiz_id, watermark)
+            if result is not None:
+                return result
+            # Sem eventos as respostas nunca serão reconstruídas: refaz pelo export completo,
+            # substituindo os arquivos existentes para não reaproveitar dados antigos
+            logging.warning('Eventos do quiz indisponíveis; executando extração completa.')
+            overwrite = True
+    elif incremental:
+        logging.warning('Sem watermark para este quiz; executando extração completa.')
+
+    # Watermark inicial: maior submission concluída antes de gerar o report completo
+    submissions = extract_canvas.catch_new_submissions(
+        api_url=CANVAS_API_URL,
+        course_id=course_id,
+        headers=headers,
+        cert=cert,
+        quiz_id=quiz_id
+    )
+    submitted_wm = extract_canvas.latest_finished_at(submissions) if submissions else None
+
+    safe_name = extract(headers, cert, quiz_id, overwrite=overwrite)
+    if not safe_name:
+        return False
+
+    if not transform(safe_name, overwrite=overwrite):
+        return False
+
+    if not render(safe_name) or not merge():
+        return False
+
+    if submitted_wm:
+        extract_canvas.save_watermark(path_watermarks, quiz_id, submitted_wm, safe_name)
+    return True
+
+
+# -------------------------------------------------------------------
+# CLI
+# -------------------------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Automação de relatórios TI/TP (Canvas -> CSV -> PDF).')
+    sub = parser.add_subparsers(dest='command')
+
+    p = sub.add_parser('extract', help='Gera e baixa o student analysis do Canvas (data/raw).')
+    p.add_argument('--ano', help='Ano usado na busca das assignments.')
+    p.add_argument('--quiz-id', type=int, help='Pula a seleção interativa.')
+
+    p = sub.add_parser('transform', help='Trata um arquivo bruto de data/raw para data/processed.')
+    p.add_argument('safe_name', help='Nome do arquivo em data/raw.')
+
+    p = sub.add_parser('render', help='Gera overlays a partir de um arquivo tratado (offline).')
+    p.add_argument('safe_name', help='Nome do arquivo em data/processed.')
+    p.add_argument('--sis-id', action='append', dest='sis_ids', help='Renderiza apenas este docente (repetível).')
+    p.add_argument('--mes')
+    p.add_argument('--ano')
+
+    p = sub.add_parser('merge', help='Mescla os overlays com o template (offline).')
+    p.add_argument('--mes')
+    p.add_argument('--ano')
+
+    p = sub.add_parser('run', help='Fluxo completo (padrão).')
+    p.add_argument('--ano', help='Ano usado na busca das assignments.')
+    p.add_argument('--quiz-id', type=int, help='Pula a seleção interativa.')
+    p.add_argument('--incremental', action=argparse.BooleanOptionalAction, default=None,
+                   help='Força (ou desativa) o modo incremental sem perguntar.')
+
+    p = sub.add_parser('serve', help='Sobe o serviço residente de renderização (render_service).')
+    p.add_argument('--host', default='127.0.0.1', help='Apenas endereços de loopback.')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--max-datasets', type=int, default=4)
+
+    return parser
+
+
+def main(argv=None):
+    """Executa o subcomando e retorna o código de saída (0 = sucesso)."""
+    args = build_parser().parse_args(argv)
+
+    try:
+        if args.command == 'extract':
+            headers, cert = canvas_config()
+            quiz_id = args.quiz_id or choose_quiz(headers, cert, ano=args.ano)
+            safe_name = extract(headers, cert, quiz_id) if quiz_id else None
+            if not safe_name:
+                return 1
+            print(safe_name)
+            return 0
+        elif args.command == 'transform':
+            return 0 if transform(args.safe_name) else 1
+        elif args.command == 'render':
+            overlays = render(args.safe_name, sis_ids=set(args.sis_ids) if args.sis_ids else None,
+                              mes=args.mes, ano=args.ano)
+            return 0 if overlays else 1
+        elif args.command == 'merge':
+            return 0 if merge(mes=args.mes, ano=args.ano) else 1
+        elif args.command == 'serve':
+            from render_service import RenderService, serve
+            try:
+                serve(RenderService(max_datasets=args.max_datasets), host=args.host, port=args.port)
+            except (ValueError, FileNotFoundError) as e:
+                logging.error(e)
+                return 1
+            return 0
+        else:
+            ok = run(ano=getattr(args, 'ano', None), quiz_id=getattr(args, 'quiz_id', None),
+                     incremental=getattr(args, 'incremental', None))
+            return 0 if ok else 1
+    except RuntimeError as e:
+        logging.error(e)
+        return 1
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from pathlib import Path
+import logging
+import re
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from periodo import PT_MONTHS
+
+# -------------------------------------------------------------------
+# Merge com template (1ª página mesclada, demais anexadas)
+# -------------------------------------------------------------------
+def merge_first_page_then_append(template_pdf: Path, overlay_pdf: Path, output_pdf: Path):
+    """
+    Mescla a PRIMEIRA página do overlay com a PRIMEIRA página do template (background/figma).
+    Demais páginas do overlay (se houver) são anexadas sem template.
+    """
+    writer = merge_overlay_pages(PdfReader(str(template_pdf)), PdfReader(str(overlay_pdf)))
+
+    # 3) Salvar
+    output_pdf.parent.mkdir(parents=True, exist_ok=True)
+    with output_pdf.open('wb') as f:
+        writer.write(f)
+
+
+def merge_overlay_pages(templ: PdfReader, over: PdfReader) -> PdfWriter:
+    """
+    Monta o PdfWriter final: cópia da 1ª página do template com a 1ª do overlay por cima,
+    demais páginas do overlay anexadas. Não altera templ, que pode ser reutilizado
+    (lote e serviço residente usam este mesmo merge).
+    """
+    writer = PdfWriter()
+
+    # 1) Mesclar primeira página sobre uma cópia rasa do dicionário da página do template
+    #    (mantém mediabox/rotação; o merge só troca /Contents e /Resources da cópia).
+    #    O add_page vem depois do merge para clonar também os objetos do overlay.
+    templ_page = templ.pages[0]
+    base = PageObject(templ_page.pdf)
+    base.update(templ_page)
+    # A ordem "base.merge_page(first_over)" desenha o overlay por cima do template
+    base.merge_page(over.pages[0])  # PyPDF2 >= 3
+    writer.add_page(base)
+
+    # 2) Anexar demais páginas do overlay (se houver)
+    for i in range(1, len(over.pages)):
+        writer.add_page(over.pages[i])
+
+    return writer
+
+
+def final_report_name(docente: str, mes: str | None = None, ano: str | None = None) -> str:
+    """Nome do PDF final entregue ao docente."""
+    return f"Relatório {mes} {ano} - {docente}.pdf" if mes and ano else f"Relatório - {docente}.pdf"
+
+
+def merge_all_overlays_with_template(template_pdf: Path, overlays_dir: Path, output_dir: Path,
+                                     mes: str | None = None, ano: str | None = None,
+                                     overlays: list[Path] | None = None) -> list[Path]:
+    """
+    Itera todos os PDFs de overlay em overlays_dir, aplica o merge com o template e salva em output_dir.
+    Se mes/ano forem fornecidos, usa no nome do arquivo final.
+    Se overlays for informado, mescla apenas esses arquivos (execução incremental).
+    Retorna os PDFs finais gerados.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if overlays is None:
+        overlays = sorted(overlays_dir.glob('overlay_*.pdf'))
+
+    if not overlays:
+        logging.warning("Nenhum overlay encontrado para mesclar.")
+        return []
+
+    merged = []
+    for overlay_pdf in overlays:    
+        # extrai docente e tenta inferir mes/ano do nome do overlay
+        stem = overlay_pdf.stem  # ex.: 'overlay_Joao Silva_Junho_2025'
+        m_mes_ano = re.search(r'_(janeiro|fevereiro|mar[cç]o|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro)_(\d{4})$', stem, re.IGNORECASE)
+        if m_mes_ano:
+            mes_key = m_mes_ano.group(1).lower().replace('ç', 'c')
+            ano_det = m_mes_ano.group(2)
+            mes_det = PT_MONTHS.get(mes_key, mes_key.capitalize())
+            mes_f = mes or mes_det
+            ano_f = ano or ano_det
+        else:
+            mes_f = mes
+            ano_f = ano
+        docente = stem.replace('overlay_', '').replace(f'_{mes_f}_{ano_f}', '').strip() if mes_f and ano_f else stem.replace('overlay_', '').strip()
+        final_name = final_report_name(docente, mes_f, ano_f)
+
+        output_pdf = output_dir / final_name
+        merge_first_page_then_append(template_pdf, overlay_pdf, output_pdf)
+        merged.append(output_pdf)
+        logging.info(f"Mesclado: {output_pdf}")
+
+    return merged
\ No newline at end of file
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import re
+
+# -------------------------------------------------------------------
+# Utilidades básicas
+# -------------------------------------------------------------------
+
+# Mapa de meses (case-insensitive)
+PT_MONTHS = {
+    'janeiro': 'Janeiro', 'fevereiro': 'Fevereiro', 'março': 'Março', 'marco': 'Março',
+    'abril': 'Abril', 'maio': 'Maio', 'junho': 'Junho', 'julho': 'Julho',
+    'agosto': 'Agosto', 'setembro': 'Setembro', 'outubro': 'Outubro',
+    'novembro': 'Novembro', 'dezembro': 'Dezembro'
+}
+
+def infer_mes_ano_from_safe_name(safe_name: str) -> tuple[str | None, str | None]:
+    """
+    Extrai (mes, ano) de nomes como:
+    'Relatório Junho 2025 - ... .csv' ou 'Relatorio junho 2025 ...'
+    Retorna (None, None) se não encontrar.
+    """
+    if not safe_name:
+        return None, None
+
+    name = safe_name.lower()
+    # tenta padrão '... <mes> <ano> ...'
+    m = re.search(r'\b(' + '|'.join(PT_MONTHS.keys()) + r')\b\s+(\d{4})', name)
+    if m:
+        mes_key = m.group(1)
+        ano = m.group(2)
+        mes = PT_MONTHS.get(mes_key, mes_key.capitalize())
+        return mes, ano
+
+    # fallback: tenta 'mes_ref_<mes>_<ano>' etc.
+    m2 = re.search(r'(janeiro|fevereiro|mar[cç]o|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro)[\W_]+(\d{4})', name)
+    if m2:
+        mes_key = m2.group(1).replace('ç', 'c')
+        ano = m2.group(2)
+        mes = PT_MONTHS.get(mes_key, mes_key.capitalize())
+        return mes, ano
+
+    return None, None
+
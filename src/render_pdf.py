@@ -12,48 +12,8 @@ from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.platypus import Paragraph, Frame
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.colors import Color
-from PyPDF2 import PdfReader, PdfWriter
 import re
-
-# -------------------------------------------------------------------
-# Utilidades básicas
-# -------------------------------------------------------------------
-
-# Mapa de meses (case-insensitive)
-PT_MONTHS = {
-    'janeiro': 'Janeiro', 'fevereiro': 'Fevereiro', 'março': 'Março', 'marco': 'Março',
-    'abril': 'Abril', 'maio': 'Maio', 'junho': 'Junho', 'julho': 'Julho',
-    'agosto': 'Agosto', 'setembro': 'Setembro', 'outubro': 'Outubro',
-    'novembro': 'Novembro', 'dezembro': 'Dezembro'
-}
-
-def infer_mes_ano_from_safe_name(safe_name: str) -> tuple[str | None, str | None]:
-    """
-    Extrai (mes, ano) de nomes como:
-    'Relatório Junho 2025 - ... .csv' ou 'Relatorio junho 2025 ...'
-    Retorna (None, None) se não encontrar.
-    """
-    if not safe_name:
-        return None, None
-
-    name = safe_name.lower()
-    # tenta padrão '... <mes> <ano> ...'
-    m = re.search(r'\b(' + '|'.join(PT_MONTHS.keys()) + r')\b\s+(\d{4})', name)
-    if m:
-        mes_key = m.group(1)
-        ano = m.group(2)
-        mes = PT_MONTHS.get(mes_key, mes_key.capitalize())
-        return mes, ano
-
-    # fallback: tenta 'mes_ref_<mes>_<ano>' etc.
-    m2 = re.search(r'(janeiro|fevereiro|mar[cç]o|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro)[\W_]+(\d{4})', name)
-    if m2:
-        mes_key = m2.group(1).replace('ç', 'c')
-        ano = m2.group(2)
-        mes = PT_MONTHS.get(mes_key, mes_key.capitalize())
-        return mes, ano
-
-    return None, None
+from periodo import infer_mes_ano_from_safe_name
 
 PAGE_W, PAGE_H = A4
 
@@ -287,6 +247,33 @@ def draw_questions_grid(
 # Geração de overlays (teste unitario e para todos)
 # -------------------------------------------------------------------
 
+def draw_overlay(c: canvas.Canvas,
+                 styles,
+                 question_map: dict,
+                 row: pd.Series,
+                 mes: str | None = None,
+                 ano: str | None = None,
+                 safe_name: str | None = None,
+                 show_boundary: bool = False
+                 ):
+    """
+    Desenha o overlay completo de um docente no canvas (cabeçalho + grade),
+    paginando quando houver mais perguntas que rows_per_page. Não salva o canvas.
+    """
+    # Cabeçalho e grade (primeira página)
+    draw_header(c, row, mes=mes, ano=ano, safe_name=safe_name)
+    #draw_calibration_guides(c)         # << guia visual
+    draw_questions_grid(c, styles, question_map, row, start_index=0, max_rows=GRID['rows_per_page'], show_boundary=show_boundary)
+
+    # Caso haja mais perguntas que rows_per_page, paginar
+    total_q = len(question_map)
+    idx = GRID['rows_per_page']
+    while idx < total_q:
+        c.showPage()
+        draw_header(c, row, mes=mes, ano=ano, safe_name=safe_name)  # opcional repetir o cabeçalho
+        draw_questions_grid(c, styles, question_map, row, start_index=idx, max_rows=GRID['rows_per_page'], show_boundary=show_boundary)
+        idx += GRID['rows_per_page']
+
 def build_overlay_one_row(csv_path: Path,
                           fonts_dir: Path, 
                           output_dir: Path, 
@@ -327,21 +314,7 @@ def build_overlay_one_row(csv_path: Path,
     overlay_path = output_dir / f'overlay_{docente}{suffix}.pdf'
 
     c = canvas.Canvas(str(overlay_path), pagesize=A4)
-
-    # Cabeçalho e grade (primeira página)
-    draw_header(c, row, mes=mes, ano=ano, safe_name=safe_name)
-    #draw_calibration_guides(c)         # << guia visual
-    draw_questions_grid(c, styles, question_map, row, start_index=0, max_rows=GRID['rows_per_page'], show_boundary=show_boundary)
-
-    # Caso haja mais perguntas que rows_per_page, paginar
-    total_q = len(question_map)
-    idx = GRID['rows_per_page']
-    while idx < total_q:
-        c.showPage()
-        draw_header(c, row, mes=mes, ano=ano, safe_name=safe_name)  # opcional repetir o cabeçalho
-        draw_questions_grid(c, styles, question_map, row, start_index=idx, max_rows=GRID['rows_per_page'], show_boundary=show_boundary)
-        idx += GRID['rows_per_page']
-
+    draw_overlay(c, styles, question_map, row, mes=mes, ano=ano, safe_name=safe_name, show_boundary=show_boundary)
     c.save()
     logging.info(f"Overlay gerado: {overlay_path}")
 
@@ -351,12 +324,17 @@ def build_overlays_all_rows(csv_path: Path,
                             show_boundary: bool = False,
                             mes: str | None = None,
                             ano: str | None = None,
-                            safe_name: str | None = None
-                            ):
+                            safe_name: str | None = None,
+                            sis_ids: set[str] | None = None
+                            ) -> list[Path]:
     """
     Gera overlays para TODOS os docentes (cada linha do CSV).
+    Se sis_ids for informado, gera apenas para esses docentes (execução incremental).
+    Retorna os caminhos dos overlays gerados.
     """
     df = load_processed_csv(csv_path)
+    if sis_ids is not None:
+        df = df[df['sis_id'].isin(sis_ids)]
     question_map = build_question_map(df)
     register_fonts(fonts_dir)
     styles = get_styles()
@@ -367,87 +345,16 @@ def build_overlays_all_rows(csv_path: Path,
         mes = mes or mes_inf
         ano = ano or ano_inf
 
+    generated = []
     for _, row in df.iterrows():
         docente = str(row.get('name', 'docente')).replace('/', '-').strip()
         suffix = f"_{mes}_{ano}" if mes and ano else ""
         overlay_path = output_dir / f'overlay_{docente}{suffix}.pdf'
 
         c = canvas.Canvas(str(overlay_path), pagesize=A4)
-
-        # Página 1
-        draw_header(c, row, mes=mes, ano=ano, safe_name=safe_name)
-        draw_questions_grid(c, styles, question_map, row, start_index=0, max_rows=GRID['rows_per_page'], show_boundary=show_boundary)
-
-        # Paginação se necessário
-        total_q = len(question_map)
-        idx = GRID['rows_per_page']
-        while idx < total_q:
-            c.showPage()
-            draw_header(c, row, mes=mes, ano=ano, safe_name=safe_name)  # opcional
-            draw_questions_grid(c, styles, question_map, row, start_index=idx, max_rows=GRID['rows_per_page'], show_boundary=show_boundary)
-            idx += GRID['rows_per_page']
-
+        draw_overlay(c, styles, question_map, row, mes=mes, ano=ano, safe_name=safe_name, show_boundary=show_boundary)
         c.save()
+        generated.append(overlay_path)
         logging.info(f"Overlay gerado: {overlay_path}")
 
-# -------------------------------------------------------------------
-# Merge com template (1ª página mesclada, demais anexadas)
-# -------------------------------------------------------------------
-def merge_first_page_then_append(template_pdf: Path, overlay_pdf: Path, output_pdf: Path):
-    """
-    Mescla a PRIMEIRA página do overlay com a PRIMEIRA página do template (background/figma).
-    Demais páginas do overlay (se houver) são anexadas sem template.
-    """
-    templ = PdfReader(str(template_pdf))
-    over  = PdfReader(str(overlay_pdf))
-    writer = PdfWriter()
-
-    # 1) Mesclar primeira página
-    base = templ.pages[0]
-    first_over = over.pages[0]
-    # A ordem "base.merge_page(first_over)" desenha o overlay por cima do template
-    base.merge_page(first_over)  # PyPDF2 >= 3
-    writer.add_page(base)
-
-    # 2) Anexar demais páginas do overlay (se houver)
-    for i in range(1, len(over.pages)):
-        writer.add_page(over.pages[i])
-
-    # 3) Salvar
-    output_pdf.parent.mkdir(parents=True, exist_ok=True)
-    with output_pdf.open('wb') as f:
-        writer.write(f)
-
-
-def merge_all_overlays_with_template(template_pdf: Path, overlays_dir: Path, output_dir: Path,
-                                     mes: str | None = None, ano: str | None = None):
-    """
-    Itera todos os PDFs de overlay em overlays_dir, aplica o merge com o template e salva em output_dir.
-    Se mes/ano forem fornecidos, usa no nome do arquivo final.
-    """
-    output_dir.mkdir(parents=True, exist_ok=True)
-    overlays = sorted(overlays_dir.glob('overlay_*.pdf'))
-
-    if not overlays:
-        logging.warning("Nenhum overlay encontrado para mesclar.")
-        return
-
-    for overlay_pdf in overlays:    
-        # extrai docente e tenta inferir mes/ano do nome do overlay
-        stem = overlay_pdf.stem  # ex.: 'overlay_Joao Silva_Junho_2025'
-        m_mes_ano = re.search(r'_(janeiro|fevereiro|mar[cç]o|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro)_(\d{4})$', stem, re.IGNORECASE)
-        if m_mes_ano:
-            mes_key = m_mes_ano.group(1).lower().replace('ç', 'c')
-            ano_det = m_mes_ano.group(2)
-            mes_det = PT_MONTHS.get(mes_key, mes_key.capitalize())
-            mes_f = mes or mes_det
-            ano_f = ano or ano_det
-        else:
-            mes_f = mes
-            ano_f = ano
-        docente = stem.replace('overlay_', '').replace(f'_{mes_f}_{ano_f}', '').strip() if mes_f and ano_f else stem.replace('overlay_', '').strip()
-        final_name = f"Relatório {mes_f} {ano_f} - {docente}.pdf" if mes_f and ano_f else f"Relatório - {docente}.pdf"
-
-        output_pdf = output_dir / final_name
-        merge_first_page_then_append(template_pdf, overlay_pdf, output_pdf)
-        logging.info(f"Mesclado: {output_pdf}")
\ No newline at end of file
+    return generated
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço residente de renderização: reemite o relatório final de UM docente sob demanda.
+
+Mantém em memória fontes registradas, estilos, o template e os CSVs tratados já
+indexados por sis_id (com descarte LRU por dataset), evitando o custo de
+build_overlay_one_row a cada correção pedida pela coordenação.
+
+Uso via Python:
+    service = RenderService()
+    final_name, pdf_bytes = service.render('Relatório Junho 2025 - ....csv', '123456')
+
+Uso via HTTP (somente loopback):
+    python src/main.py serve --port 8765
+    GET http://127.0.0.1:8765/render?dataset=<arquivo tratado>&sis_id=<sis_id>
+"""
+from pathlib import Path
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+from io import BytesIO
+import ipaddress
+import logging
+import threading
+
+from PyPDF2 import PdfReader
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+
+import render_pdf
+import merge_pdf
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CURRENT_DIR = Path(__file__).resolve().parent
+
+
+class RenderService:
+    """Renderizador "quente" de relatórios individuais (dataset, sis_id) -> PDF final."""
+
+    def __init__(self,
+                 data_dir: Path = CURRENT_DIR.parent / 'data' / 'processed',
+                 fonts_dir: Path = CURRENT_DIR.parent / 'fonts',
+                 template_pdf: Path = CURRENT_DIR.parent / 'template' / 'Template_Clean.pdf',
+                 max_datasets: int = 4):
+        self.data_dir = Path(data_dir)
+        self.max_datasets = max_datasets
+        self._datasets = OrderedDict()  # nome -> (mtime, {sis_id: row}, question_map)
+        self._lock = threading.Lock()
+
+        render_pdf.register_fonts(Path(fonts_dir))
+        self.styles = render_pdf.get_styles()
+        # Template parseado uma única vez; merge_overlay_pages mescla sobre uma cópia da 1ª página
+        self.template = PdfReader(str(template_pdf))
+        logging.info('Serviço de renderização pronto (fontes, estilos e template em memória).')
+
+    def _load_dataset(self, dataset: str):
+        """Retorna (linhas por sis_id, question_map), recarregando se o CSV mudou no disco."""
+        if (not dataset or dataset in ('.', '..') or '/' in dataset or '\\' in dataset
+                or Path(dataset).name != dataset):
+            raise ValueError(f'Nome de dataset inválido: {dataset}')
+        csv_path = self.data_dir / dataset
+        if not csv_path.exists():
+            raise FileNotFoundError(f'Dataset não encontrado: {csv_path}')
+
+        mtime = csv_path.stat().st_mtime
+        cached = self._datasets.get(dataset)
+        if cached and cached[0] == mtime:
+            self._datasets.move_to_end(dataset)
+            return cached[1], cached[2]
+
+        df = render_pdf.load_processed_csv(csv_path)
+        question_map = render_pdf.build_question_map(df)
+        rows = {str(row['sis_id']).strip(): row for _, row in df.iterrows()}
+        self._datasets[dataset] = (mtime, rows, question_map)
+        self._datasets.move_to_end(dataset)
+        while len(self._datasets) > self.max_datasets:
+            evicted, _ = self._datasets.popitem(last=False)
+            logging.info(f'Dataset descartado do cache: {evicted}')
+        logging.info(f'Dataset indexado: {dataset} ({len(rows)} docentes)')
+        return rows, question_map
+
+    def render(self, dataset: str, sis_id: str, mes: str | None = None, ano: str | None = None) -> tuple[str, bytes]:
+        """
+        Gera o PDF final (template + overlay) do docente em memória.
+        Retorna (nome do arquivo final, bytes do PDF). Levanta KeyError se o sis_id não existir.
+        """
+        with self._lock:
+            rows, question_map = self._load_dataset(dataset)
+            row = rows.get(str(sis_id).strip())
+            if row is None:
+                raise KeyError(f'sis_id {sis_id} não encontrado em {dataset}')
+
+            if not mes or not ano:
+                mes_inf, ano_inf = render_pdf.infer_mes_ano_from_safe_name(dataset)
+                mes = mes or mes_inf
+                ano = ano or ano_inf
+
+            overlay = BytesIO()
+            c = canvas.Canvas(overlay, pagesize=A4)
+            render_pdf.draw_overlay(c, self.styles, question_map, row, mes=mes, ano=ano, safe_name=dataset)
+            c.save()
+            overlay.seek(0)
+
+            writer = merge_pdf.merge_overlay_pages(self.template, PdfReader(overlay))
+            output = BytesIO()
+            writer.write(output)
+
+        docente = str(row.get('name', 'docente')).replace('/', '-').strip()
+        return merge_pdf.final_report_name(docente, mes, ano), output.getvalue()
+
+
+def make_handler(service: RenderService):
+    """Cria o handler HTTP ligado ao serviço: GET /render?dataset=...&sis_id=...[&mes=...&ano=...]"""
+
+    class RenderHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/render':
+                self.send_error(404, 'Not Found', 'Use /render?dataset=...&sis_id=...')
+                return
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if not params.get('dataset') or not params.get('sis_id'):
+                self.send_error(400, 'Bad Request', 'Parâmetros obrigatórios: dataset e sis_id')
+                return
+            try:
+                final_name, pdf = service.render(params['dataset'], params['sis_id'],
+                                                 mes=params.get('mes'), ano=params.get('ano'))
+            except (FileNotFoundError, KeyError) as e:
+                # Status line é latin-1 estrito: o detalhe (com o nome do dataset) vai no corpo
+                self.send_error(404, 'Not Found', str(e))
+                return
+            except ValueError as e:
+                self.send_error(400, 'Bad Request', str(e))
+                return
+            except Exception as e:
+                logging.error(f'Erro ao renderizar relatório: {e}')
+                self.send_error(500, 'Internal Server Error', 'Erro ao renderizar relatório')
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/pdf')
+            self.send_header('Content-Length', str(len(pdf)))
+            self.send_header('Content-Disposition', f"inline; filename*=UTF-8''{quote(final_name)}")
+            self.end_headers()
+            self.wfile.write(pdf)
+
+        def log_message(self, format, *args):
+            logging.info(f'{self.address_string()} - {format % args}')
+
+    return RenderHandler
+
+
+def is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def serve(service: RenderService, host: str = '127.0.0.1', port: int = 8765):
+    """Sobe o endpoint HTTP local e atende até Ctrl+C. Sem autenticação: só aceita loopback."""
+    if not is_loopback(host):
+        raise ValueError(f'Host {host} não permitido: o serviço só escuta em localhost/loopback.')
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    logging.info(f'Serviço de renderização em http://{host}:{port}/render')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
@@ -5,31 +5,48 @@ import os
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Posições (no student analysis) de name, sis_id, submitted e das 15 respostas
+RAW_USECOLS = [0,2,6,7,9,11,13,15,17,19,21,23,25,27,29,31,33,35]
+
+def clean_report(df):
+    """Aplica o tratamento padrão sobre o DataFrame bruto (já restrito às RAW_USECOLS)."""
+    logging.info('Transformação dos dados em processamento...')
+    df.columns = [col.strip() for col in df.columns]
+    df.fillna('',inplace=True)
+    cols_to_change = range(3,18)
+    new_names = {df.columns[i]: df.columns[i][9:].strip() for i in cols_to_change}
+    df.rename(columns=new_names, inplace=True)
+    df['submitted'] = pd.to_datetime(df['submitted'], errors='coerce')
+    df['submitted'] = df['submitted'].dt.strftime('%d/%m/%Y')
+    df['name'] = [n.strip().title() for n in df['name']]
+    logging.info('Arquivo tratado! Salvando novo arquivo...')
+    return df
+
 def load_clean_report(data_path):
     try:
-        df = pd.read_csv(data_path, usecols=[0,2,6,7,9,11,13,15,17,19,21,23,25,27,29,31,33,35],dtype={'sis_id': str})
+        df = pd.read_csv(data_path, usecols=RAW_USECOLS,dtype={'sis_id': str})
         logging.info(f'Arquivo carregado com {len(df)} linhas e {len(df.columns)} colunas.')
+        return clean_report(df)
 
-        logging.info('Transformação dos dados em processamento...')
-        df.columns = [col.strip() for col in df.columns]
-        df.fillna('',inplace=True)
-        cols_to_change = range(3,18)
-        new_names = {df.columns[i]: df.columns[i][9:].strip() for i in cols_to_change}
-        df.rename(columns=new_names, inplace=True)
-        df['submitted'] = pd.to_datetime(df['submitted'], errors='coerce')
-        df['submitted'] = df['submitted'].dt.strftime('%d/%m/%Y')
-        df['name'] = [n.strip().title() for n in df['name']]
-        logging.info('Arquivo tratado! Salvando novo arquivo...')
+    except Exception as e:
+        logging.error(f'Erro ao processar arquivo: {e}')
 
-        return df
+def load_clean_rows(rows, columns):
+    """Trata apenas as linhas novas vindas da extração incremental (mesmo layout do CSV bruto)."""
+    try:
+        df = pd.DataFrame(rows, columns=columns)
+        df['sis_id'] = df['sis_id'].astype(str)
+        df = df.iloc[:, RAW_USECOLS].copy()
+        logging.info(f'{len(df)} linha(s) nova(s) carregada(s).')
+        return clean_report(df)
 
     except Exception as e:
-        logging.error(f'Erro ao processar arquivo: {e}')
+        logging.error(f'Erro ao processar linhas incrementais: {e}')
 
-def save_data_processed(df_clean,path_data_p,name_data_p):
+def save_data_processed(df_clean,path_data_p,name_data_p,overwrite=False):
     save_path = f'{path_data_p}/{name_data_p}'
     df = pd.DataFrame(df_clean)
-    if os.path.exists(save_path):
+    if os.path.exists(save_path) and not overwrite:
         logging.info(f'Arquivo tratado ja existente em: {save_path}')
         return
     try:
@@ -37,4 +54,32 @@ def save_data_processed(df_clean,path_data_p,name_data_p):
         logging.info(f'Arquivo tratado salvo com sucesso em: {save_path}')
         return save_path
     except Exception as e:
-        logging.error(f'Erro ao tentar salvar o arquivo: {e}')
\ No newline at end of file
+        logging.error(f'Erro ao tentar salvar o arquivo: {e}')
+
+def _norm_header(col):
+    return ' '.join(str(col).split())
+
+def merge_data_processed(df_new,path_data_p,name_data_p):
+    """
+    Mescla as linhas novas no arquivo tratado existente: docentes (sis_id) que reenviaram
+    são substituídos, os demais são acrescentados. Sobrescreve o arquivo.
+    """
+    save_path = f'{path_data_p}/{name_data_p}'
+    if not os.path.exists(save_path):
+        return save_data_processed(df_new,path_data_p,name_data_p)
+    try:
+        df_old = pd.read_csv(save_path,sep=';',dtype=str).fillna('')
+        df_new = pd.DataFrame(df_new).astype(str)
+        # Compara os cabeçalhos das perguntas (já sem o prefixo '<id>: '): se o quiz teve
+        # perguntas reordenadas/trocadas, as respostas cairiam sob a pergunta errada
+        if [_norm_header(c) for c in df_new.columns] != [_norm_header(c) for c in df_old.columns]:
+            logging.error('Perguntas das linhas novas diferem do arquivo tratado existente. Mesclagem cancelada.')
+            return
+        df_new.columns = df_old.columns
+        df_old = df_old[~df_old['sis_id'].isin(df_new['sis_id'])]
+        df = pd.concat([df_old,df_new],ignore_index=True)
+        df.to_csv(path_or_buf=save_path,sep=';',index=False)
+        logging.info(f'{len(df_new)} linha(s) mesclada(s) em: {save_path}')
+        return save_path
+    except Exception as e:
+        logging.error(f'Erro ao tentar mesclar o arquivo: {e}')
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os módulos de src/ se importam pelo nome (ex.: `import extract_canvas`), como em main.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
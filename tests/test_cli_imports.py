@@ -0,0 +1,59 @@
+"""
+Orçamento de startup da CLI: importar main.py (e o caminho do `merge`) não pode
+carregar módulos pesados nem de rede, e deve caber no tempo definido abaixo.
+"""
+import importlib.util
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+
+# Segundos para importar o módulo (medido dentro do subprocesso, sem o boot do interpretador)
+IMPORT_BUDGET_S = 0.25
+# O merge carrega PyPDF2, mas não pandas/ReportLab
+MERGE_IMPORT_BUDGET_S = 1.0
+
+HEAVY = ('requests', 'certifi', 'dotenv', 'pandas', 'reportlab', 'PyPDF2')
+
+
+def import_in_subprocess(statement):
+    """
+    Executa o import num interpretador limpo; retorna (segundos, módulos pesados carregados
+    pelo import). Módulos já presentes no boot (ex.: certifi via .pth do site) são ignorados.
+    """
+    code = (
+        'import json, sys, time\n'
+        f'sys.path.insert(0, {str(SRC_DIR)!r})\n'
+        'before = set(sys.modules)\n'
+        't0 = time.perf_counter()\n'
+        f'{statement}\n'
+        'elapsed = time.perf_counter() - t0\n'
+        f'loaded = [m for m in {HEAVY!r} if m in sys.modules and m not in before]\n'
+        'print(json.dumps({"elapsed": elapsed, "loaded": loaded}))\n'
+    )
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    return data['elapsed'], data['loaded']
+
+
+def test_import_main_is_light():
+    elapsed, loaded = import_in_subprocess('import main')
+    assert loaded == []
+    assert elapsed < IMPORT_BUDGET_S
+
+
+def test_build_parser_is_light():
+    elapsed, loaded = import_in_subprocess('import main; main.build_parser()')
+    assert loaded == []
+    assert elapsed < IMPORT_BUDGET_S
+
+
+@pytest.mark.skipif(importlib.util.find_spec('PyPDF2') is None, reason='PyPDF2 não instalado')
+def test_merge_path_skips_render_stack():
+    elapsed, loaded = import_in_subprocess('import main; from merge_pdf import merge_all_overlays_with_template')
+    assert loaded == ['PyPDF2']
+    assert elapsed < MERGE_IMPORT_BUDGET_S
@@ -0,0 +1,128 @@
+from unittest import mock
+
+import pytest
+
+import extract_canvas
+
+API = 'https://canvas.test'
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200, next_url=None):
+        self.payload = payload
+        self.status_code = status_code
+        self.text = str(payload)
+        self.links = {'next': {'url': next_url}} if next_url else {}
+
+    def json(self):
+        return self.payload
+
+
+def sub(sub_id, finished_at, state='complete', user_id=None):
+    return {'id': sub_id, 'user_id': user_id or sub_id, 'attempt': 1,
+            'finished_at': finished_at, 'workflow_state': state}
+
+
+QUESTIONS = [
+    {'id': 1001, 'position': 1, 'question_text': '<p>Atividades</p>', 'answers': []},
+    {'id': 1002, 'position': 2, 'question_text': 'Turno', 'answers': [{'id': 7, 'text': 'Manhã'}]},
+]
+
+
+def test_get_paginated_raises_on_failed_page():
+    pages = [FakeResponse({'quiz_submissions': [sub(1, '2026-10-01T10:00:00Z')]}, next_url=f'{API}/p2'),
+             FakeResponse('erro', status_code=500)]
+    with mock.patch.object(extract_canvas.requests, 'get', side_effect=pages):
+        with pytest.raises(extract_canvas.CanvasRequestError):
+            extract_canvas._get_paginated(f'{API}/p1', {}, None, key='quiz_submissions')
+
+
+def test_catch_new_submissions_filters_since_and_state():
+    payload = {
+        'quiz_submissions': [
+            sub(1, '2026-10-01T10:00:00Z'),                              # antes do watermark
+            sub(2, '2026-10-05T12:00:00Z'),                              # mesmo segundo: rebuscada
+            sub(3, '2026-10-06T08:00:00Z'),
+            sub(4, '2026-10-07T08:00:00Z', state='untaken'),
+            sub(5, None, state='complete'),
+            sub(6, '2026-10-08T08:00:00Z', state='pending_review'),
+        ],
+        'users': [{'id': 3, 'name': 'Ana', 'sis_user_id': '333'}],
+    }
+    with mock.patch.object(extract_canvas.requests, 'get', return_value=FakeResponse(payload)):
+        new = extract_canvas.catch_new_submissions(API, 1, {}, None, 10, since='2026-10-05T12:00:00Z')
+
+    assert [s['id'] for s in new] == [2, 3, 6]
+    assert new[1]['user']['sis_user_id'] == '333'
+
+
+def test_catch_new_submissions_returns_none_on_failure():
+    with mock.patch.object(extract_canvas.requests, 'get', return_value=FakeResponse('erro', status_code=500)):
+        assert extract_canvas.catch_new_submissions(API, 1, {}, None, 10) is None
+
+
+def test_format_answer_choices_and_lists():
+    question = {'answers': [{'id': 7, 'text': 'Manhã'}, {'id': 8, 'text': 'Tarde'}]}
+    assert extract_canvas._format_answer(question, '7') == 'Manhã'
+    assert extract_canvas._format_answer(question, ['7', 8]) == 'Manhã,Tarde'
+    assert extract_canvas._format_answer(question, None) == ''
+    assert extract_canvas._format_answer({'answers': []}, '<p>Texto &amp; mais</p>') == 'Texto & mais'
+
+
+def answered(*pairs):
+    return {'quiz_submission_events': [{
+        'event_type': 'question_answered', 'created_at': '2026-10-06T08:00:00Z',
+        'event_data': [{'quiz_question_id': str(qid), 'answer': ans} for qid, ans in pairs],
+    }]}
+
+
+def test_incremental_rows_hold_watermark_below_failed_submission():
+    submissions = [sub(1, '2026-10-06T08:00:00Z'), sub(2, '2026-10-07T08:00:00Z'), sub(3, '2026-10-08T08:00:00Z')]
+    answers = {1: {'1001': 'Aulas', '1002': 'Manhã'}, 2: None, 3: {'1001': 'Pesquisa', '1002': ''}}
+
+    with mock.patch.object(extract_canvas, 'catch_new_submissions', return_value=submissions), \
+         mock.patch.object(extract_canvas, 'catch_quiz_questions', return_value=QUESTIONS), \
+         mock.patch.object(extract_canvas, 'catch_submission_answers',
+                           side_effect=lambda *a: answers[a[5]['id']]):
+        rows, columns, watermark, status = extract_canvas.catch_incremental_rows(
+            API, 1, {}, None, 10, since='2026-10-01T00:00:00Z')
+
+    assert status == extract_canvas.INCREMENTAL_PARTIAL
+    assert [r['id'] for r in rows] == [1, 3]
+    assert watermark == '2026-10-06T08:00:00Z'
+    assert columns[7] == '1001: Atividades'
+
+
+def test_incremental_rows_unavailable_events_request_full_export():
+    responses = [FakeResponse(QUESTIONS), FakeResponse('not found', status_code=404)]
+    with mock.patch.object(extract_canvas, 'catch_new_submissions', return_value=[sub(1, '2026-10-06T08:00:00Z')]), \
+         mock.patch.object(extract_canvas.requests, 'get', side_effect=responses):
+        rows, _, watermark, status = extract_canvas.catch_incremental_rows(
+            API, 1, {}, None, 10, since='2026-10-01T00:00:00Z')
+
+    assert status == extract_canvas.INCREMENTAL_UNAVAILABLE
+    assert rows is None
+    assert watermark == '2026-10-01T00:00:00Z'
+
+
+def test_incremental_rows_ok():
+    responses = [FakeResponse(QUESTIONS), FakeResponse(answered((1001, 'Aulas'), (1002, '7')))]
+    with mock.patch.object(extract_canvas, 'catch_new_submissions', return_value=[sub(1, '2026-10-06T08:00:00Z')]), \
+         mock.patch.object(extract_canvas.requests, 'get', side_effect=responses):
+        rows, _, watermark, status = extract_canvas.catch_incremental_rows(API, 1, {}, None, 10)
+
+    assert status == extract_canvas.INCREMENTAL_OK
+    assert rows[0]['1002: Turno'] == 'Manhã'
+    assert watermark == '2026-10-06T08:00:00Z'
+
+
+def test_watermark_round_trip(tmp_path):
+    state_path = tmp_path / 'watermarks.json'
+    assert extract_canvas.load_watermark(state_path, 10) is None
+
+    extract_canvas.save_watermark(state_path, 10, '2026-10-06T08:00:00Z', 'Relatório Junho 2025.csv')
+    extract_canvas.save_watermark(state_path, 20, '2026-10-07T08:00:00Z', 'outro.csv')
+
+    assert extract_canvas.load_watermark(state_path, 10) == {
+        'submitted': '2026-10-06T08:00:00Z', 'dataset': 'Relatório Junho 2025.csv'}
+    assert extract_canvas.load_watermark(state_path, '20')['dataset'] == 'outro.csv'
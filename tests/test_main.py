@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+import main
+import transformer
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    raw, processed = tmp_path / 'raw', tmp_path / 'processed'
+    raw.mkdir()
+    processed.mkdir()
+    monkeypatch.setattr(main, 'path_download', raw)
+    monkeypatch.setattr(main, 'path_data_ps', processed)
+    monkeypatch.setattr(main, 'template_pdf', tmp_path / 'template' / 'Template_Clean.pdf')
+    return raw, processed
+
+
+CLEAN = pd.DataFrame([['Ana', '1', '06/10/2026', 'Aulas']], columns=['name', 'sis_id', 'submitted', 'Atividades'])
+
+
+def test_transform_fails_when_clean_fails_even_if_processed_exists(dirs, monkeypatch):
+    _, processed = dirs
+    (processed / 'dados.csv').write_text('antigo')
+    monkeypatch.setattr(transformer, 'load_clean_report', lambda data_path: None)
+
+    assert main.transform('dados.csv') is False
+    assert main.main(['transform', 'dados.csv']) == 1
+
+
+def test_transform_keeps_existing_processed_without_overwrite(dirs, monkeypatch):
+    _, processed = dirs
+    (processed / 'dados.csv').write_text('antigo')
+    monkeypatch.setattr(transformer, 'load_clean_report', lambda data_path: CLEAN.copy())
+
+    assert main.transform('dados.csv') is True
+    assert (processed / 'dados.csv').read_text() == 'antigo'
+
+    assert main.transform('dados.csv', overwrite=True) is True
+    assert 'Aulas' in (processed / 'dados.csv').read_text()
+
+
+def test_render_and_merge_exit_nonzero_on_missing_files(dirs):
+    assert main.main(['render', 'nao_existe.csv']) == 1
+    assert main.main(['merge']) == 1
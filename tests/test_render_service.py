@@ -0,0 +1,133 @@
+import os
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from PyPDF2 import PdfReader
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+import merge_pdf
+import render_service
+
+FONTS_DIR = Path(__file__).resolve().parent.parent / 'fonts'
+QUESTIONS = [f'Pergunta {i}' for i in range(1, 16)]
+
+
+def write_processed(path, rows):
+    pd.DataFrame([[name, sis_id, '06/10/2026', *[f'resp {i}' for i in range(1, 16)]] for name, sis_id in rows],
+                 columns=['name', 'sis_id', 'submitted', *QUESTIONS]).to_csv(path, sep=';', index=False)
+
+
+def pdf_with_text(path, text):
+    c = canvas.Canvas(str(path), pagesize=A4)
+    c.drawString(100, 100, text)
+    c.save()
+    return path
+
+
+@pytest.fixture
+def service(tmp_path):
+    template = pdf_with_text(tmp_path / 'template.pdf', 'TEMPLATE')
+    data_dir = tmp_path / 'processed'
+    data_dir.mkdir()
+    return render_service.RenderService(data_dir=data_dir, fonts_dir=FONTS_DIR,
+                                        template_pdf=template, max_datasets=2)
+
+
+def test_render_returns_final_pdf(service):
+    write_processed(service.data_dir / 'Relatório Junho 2025.csv', [('Ana Silva', '111')])
+
+    final_name, pdf = service.render('Relatório Junho 2025.csv', '111')
+
+    assert final_name == 'Relatório Junho 2025 - Ana Silva.pdf'
+    text = PdfReader(BytesIO(pdf)).pages[0].extract_text()
+    assert 'TEMPLATE' in text and 'Ana Silva' in text
+    # o template em cache não é alterado entre renders
+    assert service.template.pages[0].extract_text().strip() == 'TEMPLATE'
+
+
+def test_lru_evicts_past_max_datasets(service):
+    for name in ('a.csv', 'b.csv', 'c.csv'):
+        write_processed(service.data_dir / name, [('Ana', '1')])
+
+    service.render('a.csv', '1')
+    service.render('b.csv', '1')
+    service.render('a.csv', '1')  # 'a' passa a ser o mais recente
+    service.render('c.csv', '1')
+
+    assert list(service._datasets) == ['a.csv', 'c.csv']
+
+
+def test_reloads_dataset_when_mtime_changes(service):
+    path = service.data_dir / 'dados.csv'
+    write_processed(path, [('Ana', '1')])
+    service.render('dados.csv', '1')
+    with pytest.raises(KeyError):
+        service.render('dados.csv', '2')
+
+    write_processed(path, [('Ana', '1'), ('Bruno', '2')])
+    mtime = path.stat().st_mtime + 10
+    os.utime(path, (mtime, mtime))
+
+    final_name, _ = service.render('dados.csv', '2')
+    assert final_name == 'Relatório - Bruno.pdf'
+
+
+@pytest.mark.parametrize('dataset', ['..', '.', '', '../dados.csv', 'sub/dados.csv', 'sub\\dados.csv'])
+def test_rejects_dataset_paths(service, dataset):
+    with pytest.raises(ValueError):
+        service.render(dataset, '1')
+
+
+def test_unknown_sis_id_raises_key_error(service):
+    write_processed(service.data_dir / 'dados.csv', [('Ana', '1')])
+    with pytest.raises(KeyError):
+        service.render('dados.csv', '999')
+
+
+def test_is_loopback():
+    for host in ('127.0.0.1', '127.0.0.2', '::1', 'localhost'):
+        assert render_service.is_loopback(host)
+    for host in ('0.0.0.0', '192.168.0.10', '::', 'example.com'):
+        assert not render_service.is_loopback(host)
+
+
+def test_serve_rejects_non_loopback(service):
+    with pytest.raises(ValueError):
+        render_service.serve(service, host='0.0.0.0', port=0)
+
+
+def test_http_errors_with_non_latin1_dataset(service):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), render_service.make_handler(service))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        base = f'http://127.0.0.1:{server.server_address[1]}/render?'
+        for dataset, status in (('Relatório Junho – 2025.csv', 404), ('..', 400)):
+            query = urllib.parse.urlencode({'dataset': dataset, 'sis_id': '1'})
+            with pytest.raises(urllib.error.HTTPError) as err:
+                urllib.request.urlopen(base + query, timeout=5)
+            assert err.value.code == status
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_merge_first_page_then_append_matches_service_merge(tmp_path):
+    template = pdf_with_text(tmp_path / 'template.pdf', 'TEMPLATE')
+    overlay = pdf_with_text(tmp_path / 'overlay.pdf', 'OVERLAY')
+    output = tmp_path / 'final.pdf'
+
+    merge_pdf.merge_first_page_then_append(template, overlay, output)
+
+    batch = PdfReader(str(output)).pages[0].extract_text()
+    out = BytesIO()
+    merge_pdf.merge_overlay_pages(PdfReader(str(template)), PdfReader(str(overlay))).write(out)
+    assert PdfReader(out).pages[0].extract_text() == batch
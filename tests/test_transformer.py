@@ -0,0 +1,35 @@
+import pandas as pd
+
+import transformer
+
+COLUMNS = ['name', 'sis_id', 'submitted', 'Atividades', 'Turno']
+
+
+def write_processed(path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, sep=';', index=False)
+
+
+def test_merge_data_processed_replaces_by_sis_id(tmp_path):
+    write_processed(tmp_path / 'dados.csv', [
+        ['Ana', '1', '01/10/2026', 'Aulas', 'Manhã'],
+        ['Bruno', '2', '01/10/2026', 'Pesquisa', 'Tarde'],
+    ])
+    df_new = pd.DataFrame([['Ana', '1', '06/10/2026', 'Extensão', 'Noite'],
+                           ['Carla', '3', '06/10/2026', 'Aulas', 'Manhã']], columns=COLUMNS)
+
+    assert transformer.merge_data_processed(df_new, tmp_path, 'dados.csv')
+
+    df = pd.read_csv(tmp_path / 'dados.csv', sep=';', dtype=str).set_index('sis_id')
+    assert sorted(df.index) == ['1', '2', '3']
+    assert df.loc['1', 'Atividades'] == 'Extensão'
+    assert df.loc['2', 'Atividades'] == 'Pesquisa'
+
+
+def test_merge_data_processed_refuses_different_questions(tmp_path):
+    write_processed(tmp_path / 'dados.csv', [['Ana', '1', '01/10/2026', 'Aulas', 'Manhã']])
+    before = (tmp_path / 'dados.csv').read_text()
+    df_new = pd.DataFrame([['Ana', '1', '06/10/2026', 'Manhã', 'Aulas']],
+                          columns=['name', 'sis_id', 'submitted', 'Turno', 'Atividades'])
+
+    assert transformer.merge_data_processed(df_new, tmp_path, 'dados.csv') is None
+    assert (tmp_path / 'dados.csv').read_text() == before